@@ -1,44 +1,118 @@
 import asyncio
-import json
+import functools
+import logging
+import time
 from pathlib import Path
 
-from eth_utils import to_checksum_address
+import orjson
+from async_lru import alru_cache
+from eth_abi import decode
 from sugar import get_async_chain, BaseChainCommon
+from sugar.chains import AsyncChain
 from sugar.token import Token
-from web3 import AsyncWeb3, AsyncHTTPProvider, Web3
+from web3 import AsyncWeb3, Web3
 
 from src.chains import CHAIN_MAP
 from src.models import SwapAerodromeBody
+from src.multicall import multicall3_aggregate
+from src.redis_utils import get_token_meta, set_token_meta
+from src.rpc_provider import HTTPXAsyncProvider
+
+logger = logging.getLogger(__name__)
 
 aerodrome_factory_path = Path(__file__).parent / "abis" / "AerodromeFactory.json"
 aerodrome_router_path = Path(__file__).parent / "abis" / "AerodromeRouter.json"
 aerodrome_pair_path = Path(__file__).parent / "abis" / "UniswapV2Pair.json"
 
-
-with open(aerodrome_factory_path) as f:
-    aerodrome_factory_abi = json.load(f)
-
-with open(aerodrome_router_path) as f:
-    aerodrome_router_abi = json.load(f)
-
-with open(aerodrome_pair_path) as f:
-    aerodrome_pair_abi = json.load(f)
+aerodrome_factory_abi = orjson.loads(aerodrome_factory_path.read_bytes())
+aerodrome_router_abi = orjson.loads(aerodrome_router_path.read_bytes())
+aerodrome_pair_abi = orjson.loads(aerodrome_pair_path.read_bytes())
 
 ERC20_ABI = [
     {"constant": True, "inputs": [], "name": "symbol", "outputs": [{"name": "", "type": "string"}], "type": "function"},
     {"constant": True, "inputs": [], "name": "decimals", "outputs": [{"name": "", "type": "uint8"}], "type": "function"},
 ]
 
-async def get_token(chain_id: str, token_address: str) -> Token:
-    rpc_uri = CHAIN_MAP[str(chain_id)]["rpc_uri"]
-    w3 = AsyncWeb3(AsyncHTTPProvider(rpc_uri))
-    token_address = to_checksum_address(token_address)
-    contract = w3.eth.contract(address=token_address, abi=ERC20_ABI)
+# One client per chain, reused across requests so the HTTP/2 connection
+# and its pool survive between calls
+_W3_BY_CHAIN: dict[str, AsyncWeb3] = {
+    chain_id: AsyncWeb3(HTTPXAsyncProvider(cfg["rpc_uri"]))
+    for chain_id, cfg in CHAIN_MAP.items()
+}
 
-    symbol, decimals = await asyncio.gather(
-        contract.functions.symbol().call(),
-        contract.functions.decimals().call(),
-    )
+# Checksumming hashes the address, memoize it for the handful of addresses we see
+_cksum = functools.lru_cache(maxsize=8192)(Web3.to_checksum_address)
+
+FACTORY_CKSUM: dict[str, str] = {
+    chain_id: Web3.to_checksum_address(cfg["factory_address"]) for chain_id, cfg in CHAIN_MAP.items()
+}
+
+_FACTORY_BY_CHAIN = {
+    chain_id: w3.eth.contract(address=FACTORY_CKSUM[chain_id], abi=aerodrome_factory_abi)
+    for chain_id, w3 in _W3_BY_CHAIN.items()
+}
+
+
+@functools.lru_cache(maxsize=64)
+def _router_contract(chain_id: str, router_address: str):
+    return _W3_BY_CHAIN[chain_id].eth.contract(address=router_address, abi=aerodrome_router_abi)
+
+
+@functools.lru_cache(maxsize=1024)
+def _pair_contract(chain_id: str, pair_address: str):
+    return _W3_BY_CHAIN[chain_id].eth.contract(address=_cksum(pair_address), abi=aerodrome_pair_abi)
+
+
+# sugar caches the pool list for the lifetime of a chain object, refresh it periodically
+POOLS_REFRESH_SECONDS = 5 * 60
+# A quote that finds no route reloads pools older than this, so freshly created pairs quote right away
+POOLS_MIN_AGE_SECONDS = 5
+
+_chains: dict[str, tuple[AsyncChain, float]] = {}
+_chains_lock = asyncio.Lock()
+
+
+async def get_chain(chain_id: str) -> AsyncChain:
+    """
+    Return an entered sugar chain for chain_id, creating it on first use.
+    """
+    chain_id = str(chain_id)
+    async with _chains_lock:
+        if chain_id not in _chains:
+            chain = await get_async_chain(
+                chain_id=chain_id,
+                rpc_uri=CHAIN_MAP[chain_id]["rpc_uri"],
+            ).__aenter__()
+            _chains[chain_id] = (chain, time.monotonic())
+
+        chain, pools_loaded_at = _chains[chain_id]
+        if time.monotonic() - pools_loaded_at > POOLS_REFRESH_SECONDS:
+            chain.get_raw_pools.cache_clear()
+            _chains[chain_id] = (chain, time.monotonic())
+
+    return chain
+
+
+async def reload_pools_since(chain_id: str, since: float) -> bool:
+    """
+    Make sure chain_id's pool list was loaded after `since` (a time.monotonic() value).
+
+    Returns False when it was already loaded after `since`, or less than
+    POOLS_MIN_AGE_SECONDS ago, and so is not worth reloading.
+    """
+    async with _chains_lock:
+        chain, pools_loaded_at = _chains[chain_id]
+        if pools_loaded_at > since:
+            # another request already reloaded the pools
+            return True
+        if time.monotonic() - pools_loaded_at < POOLS_MIN_AGE_SECONDS:
+            return False
+        chain.get_raw_pools.cache_clear()
+        _chains[chain_id] = (chain, time.monotonic())
+    return True
+
+
+def make_token(chain_id: str, token_address: str, symbol: str, decimals: int) -> Token:
     return Token(
         chain_id=chain_id,
         chain_name="Base",
@@ -49,124 +123,153 @@ async def get_token(chain_id: str, token_address: str) -> Token:
     )
 
 
+async def get_token(chain_id: str, token_address: str) -> Token:
+    return await _get_token(str(chain_id), _cksum(token_address))
+
+
+@alru_cache(maxsize=4096)
+async def _get_token(chain_id: str, token_address: str) -> Token:
+    # symbol/decimals never change: in-process cache first, then redis, then RPC
+    if meta := await get_token_meta(chain_id, token_address):
+        return make_token(chain_id, token_address, *meta)
+
+    w3 = _W3_BY_CHAIN[chain_id]
+    contract = w3.eth.contract(address=token_address, abi=ERC20_ABI)
+
+    symbol, decimals = await asyncio.gather(
+        contract.functions.symbol().call(),
+        contract.functions.decimals().call(),
+    )
+    await set_token_meta(chain_id, token_address, symbol, decimals)
+    return make_token(chain_id, token_address, symbol, decimals)
+
+
+def quote_token_path(token_in: Token, quote) -> list[str]:
+    """
+    Lowercased token addresses visited by the quote's pool path, starting at token_in.
+    """
+    token_path = [(token_in.wrapped_token_address or token_in.token_address).lower()]
+    for pool, _ in quote.path:
+        # pool.token0_address and pool.token1_address are strings
+        if token_path[-1] == pool.token0_address.lower():
+            # we entered as token0, next token is token1
+            token_path.append(pool.token1_address.lower())
+        elif token_path[-1] == pool.token1_address.lower():
+            # we entered as token1, next token is token0
+            token_path.append(pool.token0_address.lower())
+        else:
+            raise ValueError(f"token_in {token_path[-1]} not found in pool {pool.lp}")
+    return token_path
+
+
 async def get_aerodrome_quote(body: SwapAerodromeBody) -> tuple[dict | None, str | None]:
     """
     Get a sell-tax aware quote on Aerodrome.
 
     Returns (quote_dict | None, error_message | None)
     """
-    factory_address = CHAIN_MAP[str(body.chain_id)]["factory_address"]
+    chain_id = str(body.chain_id)
+    chain = await get_chain(chain_id)
+    w3 = _W3_BY_CHAIN[chain_id]
 
-    async with get_async_chain(
-        chain_id=body.chain_id,
-        rpc_uri=CHAIN_MAP[str(body.chain_id)]["rpc_uri"],
-    ) as chain:
-        # Fetch token metadata (native ETH if zero address)
-        ZERO_ADDR = "0x0000000000000000000000000000000000000000"
+    # Fetch token metadata (native ETH if zero address)
+    ZERO_ADDR = "0x0000000000000000000000000000000000000000"
 
-        # Decide which tokens actually need fetching
-        in_is_zero = body.token_in.lower() == ZERO_ADDR
-        out_is_zero = body.token_out.lower() == ZERO_ADDR
+    # Normalise the addresses we compare against once
+    token_in = body.token_in.lower()
+    token_out = body.token_out.lower()
+    agent_key_address = body.agent_key_address.lower()
+    pair_address = body.pair_address.lower()
 
-        coros = []
-        if not in_is_zero:
-            coros.append(get_token(chain_id=body.chain_id, token_address=body.token_in))
-        if not out_is_zero:
-            coros.append(get_token(chain_id=body.chain_id, token_address=body.token_out))
+    is_sell = token_in == agent_key_address
 
-        # Run the remaining coroutines concurrently (if any)
-        results = await asyncio.gather(*coros) if coros else []
+    factory = _FACTORY_BY_CHAIN[chain_id]
 
-        # Assign results back in correct order
-        token_in_obj = chain.eth if in_is_zero else results[0 if not in_is_zero else None]
-        token_out_obj = chain.eth if out_is_zero else results[-1 if not out_is_zero else None]
+    # Decide which tokens actually need fetching, once each
+    addresses = list({address for address in (token_in, token_out) if address != ZERO_ADDR})
+    tokens = await asyncio.gather(
+        *(get_token(chain_id=chain_id, token_address=address) for address in addresses),
+    )
+    tokens_by_address = dict(zip(addresses, tokens))
 
-        is_sell = token_in_obj.token_address.lower() == body.agent_key_address.lower()
+    token_in_obj = chain.eth if token_in == ZERO_ADDR else tokens_by_address[token_in]
+    token_out_obj = chain.eth if token_out == ZERO_ADDR else tokens_by_address[token_out]
+
+    quote_started_at = time.monotonic()
+    quote = await chain.get_quote(
+        from_token=token_in_obj,
+        to_token=token_out_obj,
+        amount=int(body.token_in_amount),
+    )
+    # No route may just mean the pair is newer than our cached pool list, retry once on fresh pools
+    if not quote and await reload_pools_since(chain_id, quote_started_at):
         quote = await chain.get_quote(
             from_token=token_in_obj,
             to_token=token_out_obj,
             amount=int(body.token_in_amount),
         )
-        if not quote:
-            return None, "No quote found"
-
-        lp = quote.path[0][0].lp
-        token_path = [(token_in_obj.wrapped_token_address or token_in_obj.token_address).lower()]
-        for pool, _ in quote.path:
-            # pool.token0_address and pool.token1_address are strings
-            if token_path[-1] == pool.token0_address.lower():
-                # we entered as token0, next token is token1
-                token_path.append(pool.token1_address.lower())
-            elif token_path[-1] == pool.token1_address.lower():
-                # we entered as token1, next token is token0
-                token_path.append(pool.token0_address.lower())
-            else:
-                raise ValueError(f"token_in {token_path[-1]} not found in pool {pool.lp}")
-
-        factory = chain.web3.eth.contract(address=factory_address,
-                                          abi=aerodrome_factory_abi)
-        swap_path = []
-        for i in range(len(token_path) - 1):
-            swap_path.append({
-                "from": Web3.to_checksum_address(token_path[i]),
-                "to": Web3.to_checksum_address(token_path[i + 1]),
-                "stable": False,
-                "factory": Web3.to_checksum_address(factory.address),
-            })
-
-        if not is_sell:
-            return {
-                "quote": str(quote.amount_out),
-                "path": swap_path,
-            }, None
-
-
-        if lp.lower() != body.pair_address.lower():
-            return {
-                "quote": str(quote.amount_out),
-                "path": swap_path,
-            }, None
-
-        fee_bps = await factory.functions.getFee(lp, False).call()
-        amount_in_wei = int(quote.amount_in)
-        fee = int((amount_in_wei * int(body.total_fee_percent)) / 1000)
-
-        router = chain.web3.eth.contract(address=chain.router.address,
-                                         abi=aerodrome_router_abi)
-        fee_input, fee_output = await router.functions.getAmountsOut(int(fee), [
-            {
-                "from": Web3.to_checksum_address(body.agent_key_address),
-                "to": Web3.to_checksum_address(token_path[1]),
-                "stable": False,
-                "factory": Web3.to_checksum_address(factory.address),
-            }
-        ]).call()
-
-        pair = chain.web3.eth.contract(address=Web3.to_checksum_address(body.pair_address), abi=aerodrome_pair_abi)
-        reserves = await pair.functions.getReserves().call()
-        token0 = (await pair.functions.token0().call()).lower()
-
-        is_ak_token0 = token0 == body.agent_key_address.lower()
-
-        base_reserve = reserves[1] if is_ak_token0 else reserves[0]
-        token_reserve = reserves[0] if is_ak_token0 else reserves[1]
-
-        remaining = amount_in_wei - fee
-        fee_input -= (fee_input * fee_bps) // 10000
-        remaining -= (remaining * fee_bps) // 10000
-        real_base_amount = (remaining * base_reserve) / (token_reserve + remaining)
-
-        final_quote = quote.amount_out
-        if len(token_path) > 2:
-            _, final_quote = await router.functions.getAmountsOut(int(real_base_amount), swap_path[1:]).call()
-
-        print(final_quote or quote)
+    if not quote:
+        return None, "No quote found"
+
+    lp = quote.path[0][0].lp
+    token_path = quote_token_path(token_in_obj, quote)
+
+    swap_path = []
+    for i in range(len(token_path) - 1):
+        swap_path.append({
+            "from": _cksum(token_path[i]),
+            "to": _cksum(token_path[i + 1]),
+            "stable": False,
+            "factory": factory.address,
+        })
+
+    # Only sells routed through body.pair_address get the sell-tax adjustment,
+    # everything else is done after the quote itself
+    if not is_sell or lp.lower() != pair_address:
+        return {
+            "quote": str(quote.amount_out),
+            "path": swap_path,
+        }, None
+
+    # Direct sells into the base token: the quote already is the final amount
+    if len(token_path) <= 2:
         return {
-            "quote": str(final_quote),
+            "quote": str(quote.amount_out),
             "path": swap_path,
             "pairPath": [hop[0].lp for hop in quote.path]
         }, None
 
+    # Multi-hop sell through the agent-key pair, read its fee, reserves and token order in one round-trip
+    pair = _pair_contract(chain_id, pair_address)
+    pair_results = await multicall3_aggregate(w3, [
+        (factory.address, factory.encode_abi("getFee", args=[pair.address, False])),
+        (pair.address, pair.encode_abi("getReserves")),
+        (pair.address, pair.encode_abi("token0")),
+    ])
+
+    (fee_bps,) = decode(["uint256"], pair_results[0])
+    reserves = decode(["uint112", "uint112", "uint32"], pair_results[1])
+    (token0,) = decode(["address"], pair_results[2])
+    token0 = token0.lower()
+
+    amount_in_wei = int(quote.amount_in)
+    fee = int((amount_in_wei * int(body.total_fee_percent)) / 1000)
+
+    is_ak_token0 = token0 == agent_key_address
+
+    base_reserve = reserves[1] if is_ak_token0 else reserves[0]
+    token_reserve = reserves[0] if is_ak_token0 else reserves[1]
 
+    remaining = amount_in_wei - fee
+    remaining -= (remaining * fee_bps) // 10000
+    real_base_amount = (remaining * base_reserve) / (token_reserve + remaining)
 
+    router = _router_contract(chain_id, chain.router.address)
+    _, final_quote = await router.functions.getAmountsOut(int(real_base_amount), swap_path[1:]).call()
 
+    logger.debug("aerodrome quote final=%s fallback=%s", final_quote, quote)
+    return {
+        "quote": str(final_quote),
+        "path": swap_path,
+        "pairPath": [hop[0].lp for hop in quote.path]
+    }, None
@@ -3,9 +3,17 @@ import logging
 import os
 import sys
 from io import BytesIO
-
+from typing import Literal
+
+import orjson
+import uvloop
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response
+from mangum import Mangum
+from starlette.concurrency import run_in_threadpool
 from pydantic import ValidationError
-from flask import request, jsonify, Flask, send_file
 
 from src.aerodrome import get_aerodrome_quote
 from src.models import SwapAerodromeBody
@@ -13,54 +21,84 @@ from src.profit_cards.image_gen import build_profit_card, Agent, assets
 from src.redis_utils import get_cached_swap_id, cache_swap_data
 
 logging.basicConfig(stream=sys.stdout, level=logging.INFO)
-app = Flask(__name__)
 
-loop = asyncio.new_event_loop()
-asyncio.set_event_loop(loop)
+# libuv based loop for every loop created from here on (Mangum on Lambda, uvicorn)
+asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+app = FastAPI()
 
 API_KEY = os.getenv("PROFIT_CARD_API_KEY", "supersecret123")  # fallback if unset
 
 
 # Define an error handler for ValidationError
-@app.errorhandler(ValidationError)
-def handle_validation_error(error):
+@app.exception_handler(RequestValidationError)
+@app.exception_handler(ValidationError)
+async def handle_validation_error(request, error):
     # Return a 400 response with validation error details
-    return {"status": "error", "errors": error.errors()}, 400
+    # jsonable_encoder: errors can carry the raw (bytes) input
+    return JSONResponse(jsonable_encoder({"status": "error", "errors": error.errors()}), status_code=400)
 
 
-@app.route("/", methods=["GET"])
-def healthcheck():
-    return {"status": "ok"}, 200
+@app.exception_handler(HTTPException)
+async def handle_http_exception(request, error):
+    # Keep the {"error": ...} shape our clients already parse
+    return JSONResponse({"error": error.detail}, status_code=error.status_code, headers=error.headers)
+
+
+def require_api_key(x_api_key: str | None = Header(None)):
+    # Runs as a dependency, so bad keys are rejected before the body is validated
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=401, detail="Unauthorized")
 
-@app.route("/swapAerodrome", methods=["POST"])
-def swap_aerodrome():
-    try:
-        data = request.get_json()
-        body = SwapAerodromeBody(**data)
-    except ValidationError as e:
-        return jsonify({"status": "error", "errors": e.errors()}), 400
 
-    swap_id = f"{body.chain_id}-{body.token_in}-{body.token_out}"
+@app.get("/")
+async def healthcheck():
+    return {"status": "ok"}
 
-    async def get_quote():
-        if body.use_cache:
-            if cached := await get_cached_swap_id(swap_id):
-                return jsonify(cached), 200
 
-        quote, error = await get_aerodrome_quote(body)
-        if error or not quote:
-            return jsonify({"status": "error", "error": error or "No quote found"}), 400
+@app.post("/swapAerodrome")
+async def swap_aerodrome(request: Request):
+    # Validate the raw JSON in one pass in pydantic-core, no intermediate dict
+    body = SwapAerodromeBody.model_validate_json(await request.body())
 
-        await cache_swap_data(swap_id, quote)
-        return quote, 200
+    # Every field that changes the quote is part of the key; addresses are
+    # lowercased so checksummed and plain spellings share an entry
+    swap_id = (
+        f"{body.chain_id}-{body.token_in.lower()}-{body.token_out.lower()}-{body.token_in_amount}-"
+        f"{body.agent_key_address.lower()}-{body.pair_address.lower()}-{body.total_fee_percent}"
+    )
 
-    result, code = loop.run_until_complete(get_quote())
+    if body.use_cache:
+        if cached := await get_cached_swap_id(swap_id):
+            return cached
 
-    return result, code
+    quote, error = await get_aerodrome_quote(body)
+    if error or not quote:
+        return JSONResponse({"status": "error", "error": error or "No quote found"}, status_code=400)
 
+    await cache_swap_data(swap_id, quote)
+    return quote
 
-@app.route("/profit-card", methods=["POST"])
-def profit_card():
+
+def render_profit_card(agent: Agent, percent: float, avg_price: str, cur_price: str, image_format: str) -> Response:
+    img = build_profit_card(agent, percent, avg_price, cur_price, assets)
+
+    buf = BytesIO()
+    if image_format == "webp":
+        img.save(buf, format="WEBP", quality=90)
+        return Response(content=buf.getvalue(), media_type="image/webp")
+
+    # The card is mostly artwork, a palette would band the gradients; keep truecolor
+    # and use fast zlib, compression dominates the encode time
+    img.save(buf, format="PNG", compress_level=1)
+    return Response(content=buf.getvalue(), media_type="image/png")
+
+
+@app.post("/profit-card", dependencies=[Depends(require_api_key)])
+async def profit_card(
+    request: Request,
+    image_format: Literal["png", "webp"] = Query("png", alias="format"),
+):
     """
     POST JSON body like:
     {
@@ -71,12 +109,12 @@ def profit_card():
       "averagePrice": "1.23",
       "currentPrice": "3.45"
     }
+
+    ?format=webp returns a (lossy) WebP, several times smaller than the PNG.
     """
-    client_key = request.headers.get("X-API-KEY")
-    if client_key != API_KEY:
-        return jsonify({"error": "Unauthorized"}), 401
     try:
-        data = request.get_json(force=True)
+        # Parse the body ourselves whatever the Content-Type, like the old get_json(force=True)
+        data = orjson.loads(await request.body())
         agent = Agent(
             name=data["name"],
             symbol=data["symbol"],
@@ -86,17 +124,15 @@ def profit_card():
         avg_price = str(data.get("averagePrice", "0"))
         cur_price = str(data.get("currentPrice", "0"))
     except Exception as e:
-        return jsonify({"error": f"Invalid request: {e}"}), 400
+        return JSONResponse({"error": f"Invalid request: {e}"}, status_code=400)
 
-    # Generate the card
-    img = build_profit_card(agent, percent, avg_price, cur_price, assets)
+    # Rendering is CPU bound, keep it off the event loop
+    return await run_in_threadpool(render_profit_card, agent, percent, avg_price, cur_price, image_format)
 
-    # Stream back as PNG
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
-    return send_file(buf, mimetype="image/png")
 
-if __name__ == '__main__':
-    app.run(debug=False)
+# AWS Lambda entrypoint
+handler = Mangum(app)
 
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, loop="uvloop")
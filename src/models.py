@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class SwapAerodromeBody(BaseModel):
@@ -12,6 +12,5 @@ class SwapAerodromeBody(BaseModel):
     total_fee_percent: int = Field(..., alias="totalFeePercent", ge=0,
                                    description="Fee in 1/1000ths, e.g. 30 = 3%")
 
-    class Config:
-        # allow input data to use either alias names (camelCase) or field names (snake_case)
-        populate_by_name = True
+    # allow input data to use either alias names (camelCase) or field names (snake_case)
+    model_config = ConfigDict(populate_by_name=True, frozen=True)
@@ -0,0 +1,45 @@
+from eth_abi import decode, encode
+from hexbytes import HexBytes
+from web3 import AsyncWeb3
+
+# Canonical Multicall3 deployment, same address on every EVM chain it's deployed to
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+# aggregate3((address,bool,bytes)[])
+AGGREGATE3_SELECTOR = bytes.fromhex("82ad56cb")
+
+# RPC endpoints on which Multicall3 turned out not to be deployed
+_no_multicall3: set[str] = set()
+
+
+async def _batch_eth_call(w3: AsyncWeb3, calls: list[tuple[str, str | bytes]]) -> list[bytes]:
+    async with w3.batch_requests() as batch:
+        for target, call_data in calls:
+            batch.add(w3.eth.call({"to": target, "data": call_data}))
+        return [bytes(result) for result in await batch.async_execute()]
+
+
+async def multicall3_aggregate(w3: AsyncWeb3, calls: list[tuple[str, str | bytes]]) -> list[bytes]:
+    """
+    Execute several eth_calls in a single round-trip via Multicall3 `aggregate3`.
+
+    `calls` is a list of (target, calldata) tuples. Returns the raw return data
+    of each call, in order; decode it with `eth_abi.decode`. Falls back to a
+    JSON-RPC batch when Multicall3 isn't deployed on the chain.
+    """
+    if not calls:
+        return []
+
+    endpoint = str(w3.provider.endpoint_uri)
+    if endpoint not in _no_multicall3:
+        payload = encode(
+            ["(address,bool,bytes)[]"],
+            [[(target, False, HexBytes(call_data)) for target, call_data in calls]],
+        )
+        raw = await w3.eth.call({"to": MULTICALL3_ADDRESS, "data": AGGREGATE3_SELECTOR + payload})
+        if raw:
+            (results,) = decode(["(bool,bytes)[]"], raw)
+            return [data for _, data in results]
+        # Calling an address without code returns empty data
+        _no_multicall3.add(endpoint)
+
+    return await _batch_eth_call(w3, calls)
@@ -1,11 +1,25 @@
+import bisect
+import functools
+import hashlib
+import logging
+import threading
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Tuple
 
-import requests
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageChops
+import httpx
+from cachetools import TTLCache, cached
+from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageChops, ImageOps
+from redis import RedisError
 import io
 
+from src.redis_utils import AVATAR_CACHE_SECONDS, cache_avatar, get_cached_avatar
+
+logger = logging.getLogger(__name__)
+
+# Shared pooled client, keeps connections to avatar hosts alive across cards
+http_client = httpx.Client(timeout=10, http2=True, follow_redirects=True)
+
 # ---------- Assets ----------
 
 class Assets:
@@ -29,6 +43,19 @@ assets = Assets(
     p / "DejaVuSansCondensed-Bold.ttf",
 )
 
+
+@functools.lru_cache(maxsize=256)
+def _font(path, size: int) -> ImageFont.FreeTypeFont:
+    # truetype() re-reads and parses the font file on every call
+    return ImageFont.truetype(path, size=size)
+
+
+# Fixed sizes used on every card
+_font(assets.font_bold, 70)
+_font(assets.font_regular, 50)
+_font(assets.font_price, 60)
+
+
 @dataclass
 class Agent:
     name: str
@@ -52,21 +79,36 @@ def format_percent(percent: float) -> str:
 
 
 def fit_font_size(draw, text, base_size, max_width, font_path):
-    size = base_size
-    while size > 1:
-        font = ImageFont.truetype(font_path, size=size)
-        if draw.textlength(text, font=font) <= max_width:
-            return size
-        size -= 1
-    return 1
+    """
+    Largest size <= base_size at which text fits in max_width (at least 1).
+    """
+    # text width grows with font size, so binary search the first size that overflows
+    first_too_wide = bisect.bisect_left(
+        range(1, base_size + 1),
+        True,
+        key=lambda size: draw.textlength(text, font=_font(font_path, size)) > max_width,
+    )
+    return max(first_too_wide, 1)
 
 
+@cached(TTLCache(maxsize=256, ttl=AVATAR_CACHE_SECONDS), lock=threading.Lock())
 def rounded_avatar_from_url(url: str, size: int, radius: int = 15) -> Image.Image:
     """
     Downloads an image, scales/crops it to fill a square (object-fit: cover),
     and applies rounded corners.
+
+    Results are cached in-process and in redis (shared between workers) for the
+    same hour, so a changed avatar shows up on both layers together. Callers must
+    not mutate the returned image.
     """
-    resp = requests.get(url, timeout=10)
+    cache_key = f"{hashlib.sha1(url.encode()).hexdigest()}:{size}:{radius}"
+    try:
+        if cached := get_cached_avatar(cache_key):
+            return Image.open(io.BytesIO(cached)).convert("RGBA")
+    except RedisError:
+        logger.warning("avatar cache lookup failed", exc_info=True)
+
+    resp = http_client.get(url)
     resp.raise_for_status()
     img = Image.open(io.BytesIO(resp.content)).convert("RGBA")
 
@@ -79,6 +121,13 @@ def rounded_avatar_from_url(url: str, size: int, radius: int = 15) -> Image.Imag
     draw.rounded_rectangle((0, 0, size, size), radius=radius, fill=255)
 
     img.putalpha(mask)
+
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    try:
+        cache_avatar(cache_key, buf.getvalue())
+    except RedisError:
+        logger.warning("avatar cache write failed", exc_info=True)
     return img
 
 
@@ -95,27 +144,34 @@ def draw_glow_text(
     Softer, wider glow:
       - Higher blur radius
       - Lower alpha for a more subtle, elegant neon effect
+
+    Draws in place, base must be RGBA.
     """
     W, H = base.size
     x, y = xy
+    radii = [i * 10 for i in range(3, 0, -1)]   # only 3 layers for subtle effect
 
-    img = base.convert("RGBA")
+    # Only blur a tile around the text: the halo fades out within ~3 radii,
+    # blurring the whole canvas touches mostly transparent pixels
+    padding = max(radii) * 3
+    left, top, right, bottom = font.getbbox(text, anchor=anchor)
+    left, top = max(int(x + left) - padding, 0), max(int(y + top) - padding, 0)
+    right, bottom = min(int(x + right) + padding, W), min(int(y + bottom) + padding, H)
+
+    glow_layer = Image.new("RGBA", (right - left, bottom - top), (glow_color[0], glow_color[1], glow_color[2], 0))
+    glow_draw = ImageDraw.Draw(glow_layer)
+    glow_draw.text((x - left, y - top), text, font=font, fill=(*glow_color, 180), anchor=anchor)
 
     # Wider but softer halo
-    for i in range(3, 0, -1):   # only 3 layers for subtle effect
-        glow_layer = Image.new("RGBA", (W, H), (glow_color[0], glow_color[1], glow_color[2], 0))
-        glow_draw = ImageDraw.Draw(glow_layer)
-        glow_draw.text((x, y), text, font=font, fill=(*glow_color, 180), anchor=anchor)
+    for radius in radii:
         # higher blur radius per layer, but lower opacity overall
-        blurred = glow_layer.filter(ImageFilter.GaussianBlur(radius=i * 10))
-        img = Image.alpha_composite(img, blurred)
+        blurred = glow_layer.filter(ImageFilter.GaussianBlur(radius=radius))
+        base.alpha_composite(blurred, dest=(left, top))
 
     # Final crisp white text on top
-    draw = ImageDraw.Draw(img)
+    draw = ImageDraw.Draw(base)
     draw.text((x, y), text, font=font, fill=(255, 255, 255, 255), anchor=anchor)
 
-    base.paste(img, (0, 0))
-
 
 def object_fit_cover(img: Image.Image, target_width: int, target_height: int) -> Image.Image:
     """
@@ -123,24 +179,8 @@ def object_fit_cover(img: Image.Image, target_width: int, target_height: int) ->
     Scales image to fill target box while preserving aspect ratio,
     cropping the excess evenly from the center.
     """
-    src_w, src_h = img.size
-    target_ratio = target_width / target_height
-    src_ratio = src_w / src_h
-
-    if src_ratio > target_ratio:
-        # Image is wider: match height, crop sides
-        new_height = target_height
-        new_width = int(new_height * src_ratio)
-    else:
-        # Image is taller: match width, crop top/bottom
-        new_width = target_width
-        new_height = int(new_width / src_ratio)
-
-    resized = img.resize((new_width, new_height), Image.LANCZOS)
-
-    left = (new_width - target_width) // 2
-    top = (new_height - target_height) // 2
-    return resized.crop((left, top, left + target_width, top + target_height))
+    # resizes straight from the cropped source region, no full-size intermediate
+    return ImageOps.fit(img, (target_width, target_height), method=Image.LANCZOS, centering=(0.5, 0.5))
 
 # ---------- Main ----------
 
@@ -156,8 +196,8 @@ def build_profit_card(agent: Agent, percent: float, avg_price: str, cur_price: s
     symbolFontSize, nameFontSize, lineGap = 70, 50, 20
 
     name = truncate(agent.name)
-    font_symbol = ImageFont.truetype(assets.font_bold, size=symbolFontSize)
-    font_name = ImageFont.truetype(assets.font_regular, size=nameFontSize)
+    font_symbol = _font(assets.font_bold, symbolFontSize)
+    font_name = _font(assets.font_regular, nameFontSize)
 
     block_width = max(draw.textlength(agent.symbol, font=font_symbol),
                       draw.textlength(name, font=font_name))
@@ -177,13 +217,13 @@ def build_profit_card(agent: Agent, percent: float, avg_price: str, cur_price: s
 
     # Percent text with glow
     percent_font_size = fit_font_size(draw, formatted, 350, 1250, assets.font_semibold)
-    font_percent = ImageFont.truetype(assets.font_semibold, size=percent_font_size)
+    font_percent = _font(assets.font_semibold, percent_font_size)
     percentY = int(400 + percent_font_size * 0.4)
 
     glow = (121, 225, 93) if is_profit else (217, 49, 72)
     draw_glow_text(base, (percentX, percentY), formatted, font_percent, glow)
 
-    price_font   = ImageFont.truetype(assets.font_price, size=60)
+    price_font   = _font(assets.font_price, 60)
     min_price_width = 180  # adjust to taste
 
     def pad_price(text: str) -> str:
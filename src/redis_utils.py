@@ -1,57 +1,94 @@
-import asyncio
-import json
 import os
 
 import dotenv
+import orjson
+from cachetools import TTLCache
+from redis import Redis as SyncRedis
 from redis.asyncio import Redis
 
 dotenv.load_dotenv()
 
-# Initialize Redis connection
-redis_client = Redis(
+redis_config = dict(
     host=os.environ.get("REDIS_HOST"),
     port=int(os.environ.get("REDIS_PORT", 6379)),
     username=os.environ.get("REDIS_USERNAME"),
     password=os.environ.get("REDIS_PASSWORD"),
+)
+
+# Initialize Redis connection
+redis_client = Redis(
+    **redis_config,
     decode_responses=True  # return strings instead of bytes
 )
 
+# Blocking client for the sync (threadpool) endpoints, binary values.
+# Short timeouts so an unreachable redis degrades to a cache miss instead of stalling the render
+sync_redis_client = SyncRedis(**redis_config, socket_connect_timeout=1, socket_timeout=1)
+
+SWAP_CACHE_SECONDS = 2  # ~ one block on Base, quotes move every block
+
+AVATAR_CACHE_SECONDS = 60 * 60
+
+# In-process layer in front of redis for hot swap ids, same lifetime as the redis entries
+_local_swap_cache = TTLCache(maxsize=10000, ttl=SWAP_CACHE_SECONDS)
+
+
 async def get_cached_swap_id(swap_id: str):
     """
     Fetch cached swap data by swapId. Returns dict or None.
     """
+    if cached := _local_swap_cache.get(swap_id):
+        return cached
+
     cache_key = f"swap:{swap_id}"
     cached = await redis_client.get(cache_key)
     if cached:
-        return json.loads(cached)
+        data = orjson.loads(cached)
+        _local_swap_cache[swap_id] = data
+        return data
     return None
 
 
 async def cache_swap_data(swap_id: str, data: dict):
     """
-    Cache swap data with a short redis lock to prevent race conditions.
+    Cache swap data, in-process and in redis. A single idempotent SET,
+    concurrent writers are harmless.
     """
+    _local_swap_cache[swap_id] = data
+
     cache_key = f"swap:{swap_id}"
-    lock_key = f"{cache_key}:lock"
-    cache_expiry_seconds = 15 * 60  # 15 minutes
-    lock_timeout = 15  # seconds
-
-    # Acquire lock (SET key value NX EX 15)
-    lock_acquired = await redis_client.set(
-        lock_key, "locked", ex=lock_timeout, nx=True
-    )
-
-    if lock_acquired:
-        try:
-            await redis_client.set(
-                cache_key,
-                json.dumps(data),
-                ex=cache_expiry_seconds
-            )
-        finally:
-            # Always release the lock
-            await redis_client.delete(lock_key)
-    else:
-        # Wait briefly and retry once
-        await asyncio.sleep(1)
-        return await cache_swap_data(swap_id, data)
+    await redis_client.set(cache_key, orjson.dumps(data), ex=SWAP_CACHE_SECONDS)
+
+
+async def get_token_meta(chain_id: str, token_address: str):
+    """
+    Fetch cached ERC20 metadata. Returns (symbol, decimals) or None.
+    """
+    cache_key = f"erc20:{chain_id}:{token_address.lower()}"
+    cached = await redis_client.get(cache_key)
+    if cached:
+        meta = orjson.loads(cached)
+        return meta["s"], meta["d"]
+    return None
+
+
+async def set_token_meta(chain_id: str, token_address: str, symbol: str, decimals: int):
+    """
+    Cache ERC20 metadata. Symbol and decimals are immutable, so no expiry.
+    """
+    cache_key = f"erc20:{chain_id}:{token_address.lower()}"
+    await redis_client.set(cache_key, orjson.dumps({"s": symbol, "d": decimals}))
+
+
+def get_cached_avatar(key: str) -> bytes | None:
+    """
+    Fetch a cached rendered avatar (PNG bytes). Returns None on miss.
+    """
+    return sync_redis_client.get(f"avatar:{key}")
+
+
+def cache_avatar(key: str, png: bytes):
+    """
+    Cache a rendered avatar for an hour.
+    """
+    sync_redis_client.set(f"avatar:{key}", png, ex=AVATAR_CACHE_SECONDS)
@@ -0,0 +1,73 @@
+import asyncio
+from typing import Any
+
+import httpx
+from web3 import AsyncHTTPProvider
+from web3._utils.batching import sort_batch_response_by_response_ids
+from web3.providers.rpc.utils import ExceptionRetryConfiguration, check_if_retry_on_failure
+from web3.types import RPCEndpoint, RPCResponse
+
+
+def make_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=32, keepalive_expiry=300),
+        timeout=10,
+    )
+
+
+class HTTPXAsyncProvider(AsyncHTTPProvider):
+    """
+    AsyncHTTPProvider that posts through a long-lived httpx client.
+
+    HTTP/2 with keep-alive lets concurrent eth_calls (and JSON-RPC batches)
+    share one TLS connection instead of opening one per in-flight request.
+    """
+
+    def __init__(self, endpoint_uri: str, client: httpx.AsyncClient | None = None, **kwargs: Any):
+        kwargs.setdefault(
+            "exception_retry_configuration",
+            ExceptionRetryConfiguration(errors=(httpx.HTTPError, TimeoutError)),
+        )
+        # web3's validation middleware asks for the chain id before every eth_call,
+        # it never changes so only ask once
+        kwargs.setdefault("cache_allowed_requests", True)
+        kwargs.setdefault("cacheable_requests", {RPCEndpoint("eth_chainId")})
+        super().__init__(endpoint_uri, **kwargs)
+        self._client = client or make_http_client()
+
+    async def _post(self, request_data: bytes) -> bytes:
+        response = await self._client.post(
+            self.endpoint_uri,
+            content=request_data,
+            headers=self.get_request_headers(),
+        )
+        response.raise_for_status()
+        return response.content
+
+    async def _make_request(self, method: RPCEndpoint, request_data: bytes) -> bytes:
+        # Same retry policy as AsyncHTTPProvider, over httpx
+        retry = self.exception_retry_configuration
+        if retry is None or not check_if_retry_on_failure(method, retry.method_allowlist):
+            return await self._post(request_data)
+
+        for i in range(retry.retries):
+            try:
+                return await self._post(request_data)
+            except tuple(retry.errors):
+                if i == retry.retries - 1:
+                    raise
+                await asyncio.sleep(retry.backoff_factor * 2**i)
+
+    async def make_batch_request(
+        self, batch_requests: list[tuple[RPCEndpoint, Any]]
+    ) -> list[RPCResponse] | RPCResponse:
+        request_data = self.encode_batch_rpc_request(batch_requests)
+        response = self.decode_rpc_response(await self._post(request_data))
+        if not isinstance(response, list):
+            # RPC errors return only one response with the error object
+            return response
+        return sort_batch_response_by_response_ids(response)
+
+    async def disconnect(self) -> None:
+        await self._client.aclose()
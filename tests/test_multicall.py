@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import httpx
+from eth_abi import decode, encode
+from web3 import AsyncWeb3, Web3
+
+from src import multicall
+from src.multicall import AGGREGATE3_SELECTOR, MULTICALL3_ADDRESS, multicall3_aggregate
+from src.rpc_provider import HTTPXAsyncProvider
+
+TOKEN_A = Web3.to_checksum_address("0x" + "aa" * 20)
+TOKEN_B = Web3.to_checksum_address("0x" + "bb" * 20)
+
+
+def _token_result(to: str, data: bytes) -> bytes:
+    # Each fake token answers with its first address byte and the calldata length
+    return encode(["uint256", "uint256"], [int(to[2:4], 16), len(data)])
+
+
+class FakeNode:
+    """
+    Minimal JSON-RPC node behind an httpx.MockTransport; records every eth_call target.
+    """
+
+    def __init__(self, multicall3_deployed: bool):
+        self.multicall3_deployed = multicall3_deployed
+        self.eth_calls: list[str] = []
+        self.posts = 0
+
+    def _eth_call(self, tx: dict) -> str:
+        to = tx["to"].lower()
+        data = bytes.fromhex(tx["data"][2:])
+        self.eth_calls.append(to)
+        if to != MULTICALL3_ADDRESS.lower():
+            return "0x" + _token_result(to, data).hex()
+        if not self.multicall3_deployed:
+            return "0x"
+        assert data[:4] == AGGREGATE3_SELECTOR
+        (calls,) = decode(["(address,bool,bytes)[]"], data[4:])
+        results = [(True, _token_result(target, call_data)) for target, _, call_data in calls]
+        return "0x" + encode(["(bool,bytes)[]"], [results]).hex()
+
+    def _answer(self, request: dict) -> dict:
+        if request["method"] == "eth_chainId":
+            result = "0x2105"
+        else:
+            assert request["method"] == "eth_call"
+            result = self._eth_call(request["params"][0])
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.posts += 1
+        body = json.loads(request.content)
+        if isinstance(body, list):
+            return httpx.Response(200, json=[self._answer(r) for r in body])
+        return httpx.Response(200, json=self._answer(body))
+
+
+def _run(node: FakeNode, endpoint: str, calls):
+    async def go():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(node))
+        w3 = AsyncWeb3(HTTPXAsyncProvider(endpoint, client=client))
+        try:
+            return await multicall3_aggregate(w3, calls)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(go())
+
+
+def _expected(calls):
+    return [_token_result(target, call_data) for target, call_data in calls]
+
+
+CALLS = [(TOKEN_A, b"\x01\x02\x03\x04"), (TOKEN_B, "0x0506070809")]
+
+
+def test_empty_calls_skip_the_rpc():
+    node = FakeNode(multicall3_deployed=True)
+    assert _run(node, "http://node-empty", []) == []
+    assert node.posts == 0
+
+
+def test_aggregate3_single_round_trip():
+    node = FakeNode(multicall3_deployed=True)
+    results = _run(node, "http://node-multicall3", CALLS)
+
+    assert results == _expected([(TOKEN_A, b"\x01\x02\x03\x04"), (TOKEN_B, bytes.fromhex("0506070809"))])
+    assert node.eth_calls == [MULTICALL3_ADDRESS.lower()]
+    assert "http://node-multicall3" not in multicall._no_multicall3
+
+
+def test_falls_back_to_batch_without_multicall3():
+    endpoint = "http://node-no-multicall3"
+    node = FakeNode(multicall3_deployed=False)
+    expected = _expected([(TOKEN_A, b"\x01\x02\x03\x04"), (TOKEN_B, bytes.fromhex("0506070809"))])
+
+    assert _run(node, endpoint, CALLS) == expected
+    assert node.eth_calls == [MULTICALL3_ADDRESS.lower(), TOKEN_A.lower(), TOKEN_B.lower()]
+    assert endpoint in multicall._no_multicall3
+
+    # The endpoint is remembered, later calls go straight to the batch
+    node.eth_calls.clear()
+    assert _run(node, endpoint, CALLS) == expected
+    assert node.eth_calls == [TOKEN_A.lower(), TOKEN_B.lower()]